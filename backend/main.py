@@ -5,17 +5,24 @@ Agentic AI FastAPI backend
 - Handles session-based PII masking/restoration
 - Loads config from environment and mcp_config.json
 """
-import json
+import asyncio
+import hashlib
 import os
 import re
+import secrets
+import sys
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Dict, List
+from typing import Annotated, Dict, List, Optional
 
-import requests
+import httpx
+import msgspec
+import orjson
+import uvicorn
+from cachetools import LRUCache, TTLCache
 from dotenv import load_dotenv
-from fastapi import FastAPI, File, HTTPException, UploadFile
-from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi import FastAPI, File, HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse, StreamingResponse
 
 # Load environment variables from .env
 load_dotenv()
@@ -29,67 +36,281 @@ if not GEMINI_API_URL:
     else:
         GEMINI_API_URL = None
 
-app = FastAPI()
+def derive_stream_url(api_url: Optional[str]) -> Optional[str]:
+    """
+    Return the streaming (SSE) variant of a ...:generateContent[?query] URL,
+    or None for any other URL.
+    """
+    if not api_url:
+        return None
+    base, _, query = api_url.partition("?")
+    if not base.endswith(":generateContent"):
+        return None
+    stream_url = base.removesuffix(":generateContent") + ":streamGenerateContent?alt=sse"
+    return f"{stream_url}&{query}" if query else stream_url
+
+# Other GEMINI_API_URL overrides need GEMINI_STREAM_URL set explicitly
+GEMINI_STREAM_URL = os.getenv("GEMINI_STREAM_URL") or derive_stream_url(GEMINI_API_URL)
+
+# Gemini request body is always {"contents": [{"parts": [{"text": prompt}]}]},
+# so only the prompt is serialized per call
+GEMINI_PAYLOAD_PREFIX = b'{"contents":[{"parts":[{"text":'
+GEMINI_PAYLOAD_SUFFIX = b'}]}]}'
+
+def gemini_payload(prompt: str) -> bytes:
+    """Build the JSON request body for a single Gemini prompt."""
+    return GEMINI_PAYLOAD_PREFIX + orjson.dumps(prompt) + GEMINI_PAYLOAD_SUFFIX
+
+def gemini_text(data: dict) -> str:
+    """Return the first candidate's text from a Gemini response, or ""."""
+    try:
+        return data["candidates"][0]["content"]["parts"][0]["text"]
+    except (KeyError, IndexError):
+        return ""
+
+# Shared connection pool so Gemini calls reuse keep-alive (HTTP/2) connections
+# instead of paying a TCP + TLS handshake per request
+HTTP_CLIENT = httpx.AsyncClient(
+    http2=True,
+    limits=httpx.Limits(max_keepalive_connections=32, max_connections=64, keepalive_expiry=90),
+    timeout=httpx.Timeout(120.0),
+    headers={"Content-Type": "application/json"},
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Close the shared HTTP client on shutdown."""
+    yield
+    await HTTP_CLIENT.aclose()
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson, falling back to the stdlib encoder
+    for content orjson rejects (e.g. integers wider than 64 bits).
+    """
+    def render(self, content) -> bytes:
+        try:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            return super().render(content)
+
+class PureASGICors:
+    """
+    CORS middleware written directly against ASGI.
+    Allows any origin (with credentials), method and header without building
+    Request/Response objects: preflights are answered here and other responses
+    get the CORS headers appended to http.response.start.
+    """
+    PREFLIGHT_HEADERS = [
+        (b"access-control-allow-methods", b"DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT"),
+        (b"access-control-max-age", b"600"),
+        (b"content-type", b"text/plain; charset=utf-8"),
+        (b"content-length", b"2"),
+    ]
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        origin = request_method = request_headers = None
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+            elif name == b"access-control-request-method":
+                request_method = value
+            elif name == b"access-control-request-headers":
+                request_headers = value
+        if origin is None:
+            # Responses still vary by Origin, so shared caches must not reuse
+            # this one for a cross-origin request
+            async def send_vary(message):
+                if message["type"] == "http.response.start":
+                    message["headers"] = [*message.get("headers", ()), (b"vary", b"Origin")]
+                await send(message)
+
+            await self.app(scope, receive, send_vary)
+            return
+        # Credentials are allowed, so the origin is echoed back instead of "*"
+        cors_headers = [
+            (b"access-control-allow-origin", origin),
+            (b"access-control-allow-credentials", b"true"),
+            (b"vary", b"Origin"),
+        ]
+        if scope["method"] == "OPTIONS" and request_method is not None:
+            headers = cors_headers + self.PREFLIGHT_HEADERS
+            if request_headers is not None:
+                headers.append((b"access-control-allow-headers", request_headers))
+            await send({"type": "http.response.start", "status": 200, "headers": headers})
+            await send({"type": "http.response.body", "body": b"OK"})
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *cors_headers]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Allow CORS for local frontend development
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+app.add_middleware(PureASGICors)
 
-class LLMRequest(BaseModel):
+# Request bodies are msgspec Structs decoded by hand, which skips Pydantic
+# model construction on the hot endpoints
+class LLMRequest(msgspec.Struct):
     prompt: str
-    model: str = None  # Accept model but ignore for now
+    model: Optional[str] = None  # Accept model but ignore for now
+
+def decode_body(body: bytes, struct_type):
+    """Decode a JSON request body into the given Struct, or raise a 422."""
+    try:
+        return msgspec.json.decode(body, type=struct_type)
+    except msgspec.DecodeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+def body_schema(struct_type) -> dict:
+    """
+    OpenAPI requestBody for a Struct-typed endpoint, passed as openapi_extra
+    since hand-decoded bodies are invisible to FastAPI's schema generation.
+    """
+    _, components = msgspec.json.schema_components([struct_type])
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": components[struct_type.__name__]}},
+        }
+    }
 
 @app.get("/")
 def read_root():
     """Root health check endpoint."""
     return {"message": "Agentic AI FastAPI backend is running."}
 
-@app.post("/llm/gemini")
-def call_gemini_llm(request: LLMRequest):
+@app.post("/llm/gemini", openapi_extra=body_schema(LLMRequest))
+async def call_gemini_llm(request: Request):
     """Call Gemini LLM with a prompt and return the response."""
+    req = decode_body(await request.body(), LLMRequest)
     if not GEMINI_API_URL:
         raise HTTPException(status_code=500, detail="Gemini API URL not configured.")
-    payload = {
-        "contents": [{"parts": [{"text": request.prompt}]}]
-    }
-    response = requests.post(GEMINI_API_URL, json=payload)
+    response = await HTTP_CLIENT.post(GEMINI_API_URL, content=gemini_payload(req.prompt))
     if response.status_code != 200:
         raise HTTPException(status_code=500, detail="Gemini API error: " + response.text)
-    data = response.json()
-    return {"response": data.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "")}
+    data = orjson.loads(response.content)
+    return {"response": gemini_text(data)}
 
-def gemini_llm_call(prompt: str) -> str:
-    """Helper function to call Gemini LLM and return the response text."""
+# Successful Gemini responses keyed by a digest of the exact prompt, and the
+# calls still in flight under the same key so a burst of identical prompts
+# shares one upstream request
+GEMINI_CACHE = LRUCache(maxsize=10_000)
+GEMINI_INFLIGHT: Dict[bytes, asyncio.Task] = {}
+
+async def gemini_llm_call(prompt: str) -> str:
+    """
+    Helper function to call Gemini LLM and return the response text.
+    Repeated prompts are served from the response cache, and concurrent calls
+    with the same prompt await a single upstream request.
+    """
     if not GEMINI_API_URL:
         return "[LLM not configured]"
-    payload = {
-        "contents": [{"parts": [{"text": prompt}]}]
-    }
-    response = requests.post(GEMINI_API_URL, json=payload)
+    key = hashlib.blake2b(prompt.encode()).digest()
+    cached = GEMINI_CACHE.get(key)
+    if cached is not None:
+        return cached
+    task = GEMINI_INFLIGHT.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_gemini_request(prompt, key))
+        GEMINI_INFLIGHT[key] = task
+        task.add_done_callback(lambda _: GEMINI_INFLIGHT.pop(key, None))
+    # Shield so one disconnecting client does not cancel the call for the others
+    return await asyncio.shield(task)
+
+async def _gemini_request(prompt: str, key: bytes) -> str:
+    """Send a single prompt to Gemini, caching and returning the response text."""
+    response = await HTTP_CLIENT.post(GEMINI_API_URL, content=gemini_payload(prompt))
     if response.status_code != 200:
         return f"[Gemini API error: {response.text}]"
-    data = response.json()
-    return data.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "")
+    data = orjson.loads(response.content)
+    text = gemini_text(data)
+    # Empty text means a blocked or empty candidate; retry it next time
+    if text:
+        GEMINI_CACHE[key] = text
+    return text
+
+class GeminiStreamError(Exception):
+    """Gemini's streaming endpoint answered with an error status."""
 
-# In-memory PII mapping store
-PII_MAPPINGS = {}
+async def gemini_stream(prompt: str):
+    """
+    Yield response text chunks from Gemini's streaming endpoint as they arrive.
+    Raises GeminiStreamError if Gemini answers with an error status.
+    """
+    async with HTTP_CLIENT.stream("POST", GEMINI_STREAM_URL, content=gemini_payload(prompt)) as response:
+        if response.status_code != 200:
+            body = await response.aread()
+            raise GeminiStreamError("Gemini API error: " + body.decode(errors="replace"))
+        async for line in response.aiter_lines():
+            if line.startswith("data:"):
+                yield gemini_text(orjson.loads(line[5:]))
+
+# In-memory PII mapping store: each session holds an append-only list of
+# (masked, original) pairs. Sessions expire after an hour so the store stays
+# bounded instead of keeping every mapping for the life of the process
+PII_MAPPINGS = TTLCache(maxsize=10_000, ttl=3600)
 
 PII_PATTERNS = [
     (r"\b\d{3}-\d{2}-\d{4}\b", "SSN"),
     (r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}", "EMAIL"),
     (r"(?:\+\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}", "PHONE"),
     (r"\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+)+\b", "NAME"),
-    (r"\d+\s+[A-Za-z\s]+(?:Street|St|Avenue|Ave|Road|Rd|Boulevard|Blvd|Lane|Ln|Drive|Dr|Court|Ct|Circle|Cir|Way|Place|Pl)", "ADDRESS"),
+    # At most three words between the number and a whole-word suffix, so the
+    # pattern cannot swallow a clause like "2 dogs and live on Main Street"
+    (r"\d+\s+(?:[A-Za-z]+\s+){1,3}(?:Street|St|Avenue|Ave|Road|Rd|Boulevard|Blvd|Lane|Ln|Drive|Dr|Court|Ct|Circle|Cir|Way|Place|Pl)\b", "ADDRESS"),
     (r"\b(?:\d[ -]*?){13,16}\b", "CREDIT_CARD"),
 ]
-
-import uuid
-
+# All classes in one alternation so sanitize_input masks in a single scan; the
+# named group that matched (m.lastgroup) is the PII type. Any prefilter in front
+# of it must use the same Unicode \d/\s/\b semantics, or it can skip PII
+PII_REGEX = re.compile("|".join(f"(?P<{t}>{p})" for p, t in PII_PATTERNS))
+# Rescans a digit run rejected as a card, which may contain an SSN or phone
+NON_CARD_REGEX = re.compile("|".join(f"(?P<{t}>{p})" for p, t in PII_PATTERNS if t != "CREDIT_CARD"))
+# Masked tokens are "[MASKED_<TYPE>#<index>]", where index is the position of
+# the original in the session mapping (credit cards add ":<last 4>" to the type)
+MASK_PREFIXES = {pii_type: f"[MASKED_{pii_type}" for _, pii_type in PII_PATTERNS}
+# A credit card match is digits plus " " / "-" separators
+_CARD_SEPARATORS = str.maketrans("", "", " -")
+# Matches every token produced by sanitize_input, so restore_pii is one scan
+_MASKED_TOKEN = re.compile(r"\[MASKED_[A-Z_]+(?::\d+)?#(\d+)\]")
+
+# Every PII class except NAME needs a digit or "@", so text without either
+# only has to be checked for names
+_DIGIT_OR_AT = re.compile(r"[\d@]")
+NAME_REGEX = re.compile("|".join(f"(?P<{t}>{p})" for p, t in PII_PATTERNS if t == "NAME"))
+
+# Capitalized bigrams the NAME pattern matches that are places or
+# organizations, not people
+NAME_DENYLIST = frozenset({
+    "United States", "United Kingdom", "United Nations", "European Union",
+    "New York", "New Jersey", "New Mexico", "New Hampshire", "New Zealand",
+    "North Carolina", "South Carolina", "North Dakota", "South Dakota",
+    "West Virginia", "Rhode Island", "Los Angeles", "San Francisco",
+    "San Diego", "San Jose", "Las Vegas", "Hong Kong", "South Africa",
+    "Saudi Arabia", "Silicon Valley",
+})
+# Last two words of a NAME match, which may be a denylisted place after
+# capitalized words like "Visit New York" or "The United States"
+_TRAILING_BIGRAM = re.compile(r"[A-Z][a-z]+\s+[A-Z][a-z]+$")
+
+_LUHN_DOUBLED = [0, 2, 4, 6, 8, 1, 3, 5, 7, 9]
+
+def luhn_valid(digits: str) -> bool:
+    """Return True if the digit string passes the Luhn checksum."""
+    total = sum(map(int, digits[-1::-2]))
+    total += sum(_LUHN_DOUBLED[int(d)] for d in digits[-2::-2])
+    return total % 10 == 0
 
 def sanitize_input(text: str, session_id: str = None) -> str:
     """
@@ -97,35 +318,68 @@ def sanitize_input(text: str, session_id: str = None) -> str:
     Supported PII: SSN, email, phone, name, address, credit card (last 4 digits only).
     """
     if not session_id:
-        session_id = str(uuid.uuid4())
-    if session_id not in PII_MAPPINGS:
-        PII_MAPPINGS[session_id] = {}
-    mapping = PII_MAPPINGS[session_id]
-    def mask(match, pii_type):
+        session_id = secrets.token_hex(16)
+    mapping = PII_MAPPINGS.get(session_id)
+    if mapping is None:
+        mapping = PII_MAPPINGS[session_id] = []
+    def mask(match):
+        pii_type = match.lastgroup
         original = match.group(0)
+        prefix = MASK_PREFIXES[pii_type]
         if pii_type == "CREDIT_CARD":
+            digits = original.translate(_CARD_SEPARATORS)
+            # Digit runs that fail the checksum are not card numbers, but the
+            # card match may have swallowed an SSN or phone number
+            if not luhn_valid(digits):
+                return NON_CARD_REGEX.sub(mask, original)
             # Only show last 4 digits
-            digits = re.sub(r"\D", "", original)
-            last4 = digits[-4:] if len(digits) >= 4 else digits
-            masked = f"[MASKED_CREDIT_CARD:{last4}]"
-        else:
-            masked = f"[MASKED_{pii_type}]"
-        mapping[masked] = original
+            prefix += ":" + digits[-4:]
+        elif pii_type == "NAME":
+            place = _TRAILING_BIGRAM.search(original)
+            if " ".join(place.group(0).split()) in NAME_DENYLIST:
+                # Only the words before the place name can still be a name
+                head = original[:place.start()].rstrip()
+                return NAME_REGEX.sub(mask, head) + original[len(head):]
+        # Numbered tokens keep every original, even repeated types or last-4s
+        masked = f"{prefix}#{len(mapping)}]"
+        mapping.append((masked, original))
         return masked
-    for pattern, pii_type in PII_PATTERNS:
-        text = re.sub(pattern, lambda m: mask(m, pii_type), text)
-    return text
+    regex = PII_REGEX if _DIGIT_OR_AT.search(text) else NAME_REGEX
+    return regex.sub(mask, text)
 
 def restore_pii(text: str, session_id: str = None) -> str:
     """
     Restore masked PII in the text using the session mapping.
     """
-    if not session_id or session_id not in PII_MAPPINGS:
+    mapping = PII_MAPPINGS.get(session_id) if session_id else None
+    if not mapping:
         return text
-    mapping = PII_MAPPINGS[session_id]
-    for masked, original in mapping.items():
-        text = text.replace(masked, original)
-    return text
+    def restore(match):
+        masked = match.group(0)
+        index = int(match.group(1))
+        if index < len(mapping) and mapping[index][0] == masked:
+            return mapping[index][1]
+        return masked
+    return _MASKED_TOKEN.sub(restore, text)
+
+# Longest tail that split_pending_token holds back as a possible masked token
+MAX_MASKED_TOKEN_LEN = 64
+
+def split_pending_token(text: str):
+    """
+    Split streamed text into (ready, pending). A trailing "[MASKED_..." token
+    that the next chunk may complete is held back in pending.
+    """
+    start = text.rfind("[")
+    if start != -1:
+        tail = text[start:]
+        if (
+            "]" not in tail
+            and len(tail) < MAX_MASKED_TOKEN_LEN
+            and ("[MASKED_".startswith(tail) or tail.startswith("[MASKED_"))
+        ):
+            return text[:start], tail
+    return text, ""
 
 # MCP server scaffolding
 @app.get("/mcp/health")
@@ -175,62 +429,202 @@ def mcp_external_api(api: str, params: dict):
     """Stub endpoint for external API integration tool."""
     return {"api": api, "params": params, "result": "not implemented"}
 
-class ProcessRequest(BaseModel):
+class ProcessRequest(msgspec.Struct):
     prompt: str
 
-@app.post("/process")
-def process_request(req: ProcessRequest):
+# MCP tools implemented in-process, keyed by (server, tool)
+TOOL_REGISTRY = {
+    ("pii-handler", "sanitize_input"): sanitize_input,
+    ("pii-handler", "restore_pii"): restore_pii,
+}
+
+def stub_tool(server: str, tool: str, desc: str):
+    """Build a placeholder for tools that are not implemented in-process."""
+    suffix = f" [processed by {server}.{tool} ({desc})]"
+    def run(text: str, session_id: str = None) -> str:
+        return text + suffix
+    return run
+
+def compile_pipeline(cfg: dict):
+    """
+    Resolve a pre/post-processing config to a list of tool callables, or None
+    if the stage is disabled. Each callable takes (text, session_id=...).
+    """
+    if not (cfg.get("enabled") and cfg.get("pipeline")):
+        return None
+    tools = []
+    for step in cfg["pipeline"]:
+        server = step.get("server")
+        tool = step.get("tool")
+        fn = TOOL_REGISTRY.get((server, tool))
+        tools.append(fn or stub_tool(server, tool, step.get("description", "")))
+    return tools
+
+# MCP pipeline config is static, so it is read and resolved once at import
+MCP_CONFIG = orjson.loads((Path(__file__).parent / "mcp_config.json").read_bytes())
+PRE_CFG = MCP_CONFIG.get("preprocessing", {})
+POST_CFG = MCP_CONFIG.get("postprocessing", {})
+PRE_PIPELINE = compile_pipeline(PRE_CFG)
+POST_PIPELINE = compile_pipeline(POST_CFG)
+
+# Tools that give the same result on a streamed response piece by piece as on
+# the whole text; with any other post tool the stream is postprocessed at the end
+STREAMABLE_TOOLS = {restore_pii}
+POST_STREAMABLE = POST_PIPELINE is None or all(tool in STREAMABLE_TOOLS for tool in POST_PIPELINE)
+
+def run_pipeline(pipeline, text, session_id):
+    """
+    Run a compiled pipeline of tools (pre or post processing) on the text.
+    Every tool shares the request's session_id, so PII masked in
+    preprocessing is restored in postprocessing.
+    """
+    for tool in pipeline:
+        text = tool(text, session_id=session_id)
+    return text
+
+async def run_process(prompt: str):
+    """
+    Run preprocessing, the Gemini call and postprocessing on one prompt
+    under a fresh PII session. Returns the result and its session_id.
+    The session's PII mapping is released once the result is restored.
+    """
+    session_id = secrets.token_hex(16)
+    try:
+        # Preprocessing
+        processed = prompt
+        if PRE_PIPELINE:
+            processed = run_pipeline(PRE_PIPELINE, processed, session_id)
+
+        # LLM (real Gemini call)
+        llm_result = await gemini_llm_call(processed)
+
+        # Postprocessing
+        if POST_PIPELINE:
+            llm_result = run_pipeline(POST_PIPELINE, llm_result, session_id)
+    finally:
+        PII_MAPPINGS.pop(session_id, None)
+
+    return llm_result, session_id
+
+@app.post("/process", openapi_extra=body_schema(ProcessRequest))
+async def process_request(request: Request):
     """
     Run the configured MCP pipeline (preprocessing, LLM, postprocessing) on the prompt.
     Handles session-based PII masking/restoration and tool orchestration.
     """
-    # Load MCP config
-    config_path = Path(__file__).parent / "mcp_config.json"
-    with open(config_path, "r") as f:
-        config = json.load(f)
-
-    import uuid
-    session_id = str(uuid.uuid4())
-
-    def run_pipeline(pipeline, text, stage, session_id):
-        """
-        Run a pipeline of tools (pre or post processing) on the text.
-        Handles PII tools and stubs for other tools.
-        """
-        for step in pipeline:
-            server = step.get("server")
-            tool = step.get("tool")
-            desc = step.get("description", "")
-            params = step.get("parameters", {}).copy()
-            # Always use the same session_id for PII tools
-            if server == "pii-handler":
-                params["session_id"] = session_id
-            if server == "pii-handler" and tool == "sanitize_input":
-                text = sanitize_input(text, session_id=params["session_id"])
-            elif server == "pii-handler" and tool == "restore_pii":
-                text = restore_pii(text, session_id=params["session_id"])
-            else:
-                # Stub for other tools
-                text += f" [processed by {server}.{tool} ({desc})]"
-        return text
-
-    # Preprocessing
-    processed = req.prompt
-    pre_cfg = config.get("preprocessing", {})
-    if pre_cfg.get("enabled") and pre_cfg.get("pipeline"):
-        processed = run_pipeline(pre_cfg["pipeline"], processed, stage="pre", session_id=session_id)
+    req = decode_body(await request.body(), ProcessRequest)
+    llm_result, session_id = await run_process(req.prompt)
+    return {
+        "result": llm_result,
+        "preprocessing": PRE_CFG,
+        "postprocessing": POST_CFG,
+        "session_id": session_id
+    }
 
-    # LLM (real Gemini call)
-    llm_result = gemini_llm_call(processed)
+# Batches stay far below the PII session cap, and only a few prompts of a batch
+# hold Gemini connections at once
+MAX_BATCH_PROMPTS = 100
+BATCH_CONCURRENCY = 8
 
-    # Postprocessing
-    post_cfg = config.get("postprocessing", {})
-    if post_cfg.get("enabled") and post_cfg.get("pipeline"):
-        llm_result = run_pipeline(post_cfg["pipeline"], llm_result, stage="post", session_id=session_id)
+class ProcessBatchRequest(msgspec.Struct):
+    prompts: Annotated[List[str], msgspec.Meta(max_length=MAX_BATCH_PROMPTS)]
 
+@app.post("/process/batch", openapi_extra=body_schema(ProcessBatchRequest))
+async def process_batch(request: Request):
+    """
+    Run the configured MCP pipeline on up to MAX_BATCH_PROMPTS prompts,
+    BATCH_CONCURRENCY at a time. Each prompt gets its own PII session;
+    results keep the input order, and a failed prompt reports its error
+    without failing the rest of the batch.
+    """
+    req = decode_body(await request.body(), ProcessBatchRequest)
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def run_one(prompt: str):
+        async with semaphore:
+            return await run_process(prompt)
+
+    outputs = await asyncio.gather(*(run_one(prompt) for prompt in req.prompts), return_exceptions=True)
+    results = []
+    for output in outputs:
+        if isinstance(output, BaseException):
+            results.append({"error": f"{type(output).__name__}: {output}"})
+        else:
+            result, session_id = output
+            results.append({"result": result, "session_id": session_id})
     return {
-        "result": llm_result,
-        "preprocessing": pre_cfg,
-        "postprocessing": post_cfg,
-        "session_id": session_id
+        "results": results,
+        "preprocessing": PRE_CFG,
+        "postprocessing": POST_CFG,
     }
+
+def sse_event(data: dict, event: str = None) -> bytes:
+    """Encode one server-sent event with a JSON payload and optional event type."""
+    prefix = f"event: {event}\n".encode() if event else b""
+    return prefix + b"data: " + orjson.dumps(data) + b"\n\n"
+
+@app.post("/process/stream", openapi_extra=body_schema(ProcessRequest))
+async def process_stream(request: Request):
+    """
+    Run the configured MCP pipeline and stream the LLM response as server-sent
+    events. The first event carries the session_id, the rest {"text": ...}.
+    Restored text is sent as soon as no masked token can still be split
+    across Gemini chunks. Upstream failures end the stream with an "error"
+    event carrying {"error": ...}.
+    """
+    req = decode_body(await request.body(), ProcessRequest)
+    if not GEMINI_STREAM_URL:
+        raise HTTPException(status_code=500, detail="Gemini stream URL not configured; set GEMINI_STREAM_URL.")
+    session_id = secrets.token_hex(16)
+
+    def postprocess(text):
+        return run_pipeline(POST_PIPELINE, text, session_id) if POST_PIPELINE else text
+
+    async def events():
+        # The PII session is created and released inside the generator, so a
+        # client that disconnects before the first event leaves nothing behind
+        try:
+            # Preprocessing
+            processed = req.prompt
+            if PRE_PIPELINE:
+                processed = run_pipeline(PRE_PIPELINE, processed, session_id)
+
+            yield sse_event({"session_id": session_id})
+            pending = ""
+            error = None
+            try:
+                async for chunk in gemini_stream(processed):
+                    pending += chunk
+                    if not POST_STREAMABLE:
+                        continue
+                    ready, pending = split_pending_token(pending)
+                    if ready:
+                        yield sse_event({"text": postprocess(ready)})
+            except GeminiStreamError as e:
+                error = str(e)
+            except httpx.HTTPError as e:
+                error = f"Gemini request failed: {type(e).__name__}: {e}"
+            except orjson.JSONDecodeError as e:
+                error = f"Malformed Gemini stream event: {e}"
+            if pending:
+                yield sse_event({"text": postprocess(pending)})
+            if error:
+                yield sse_event({"error": error}, event="error")
+        finally:
+            # The session is not exposed for later use, so release its mapping
+            PII_MAPPINGS.pop(session_id, None)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+if __name__ == "__main__":
+    # uvloop event loop and httptools parser (from uvicorn[standard]), one
+    # worker per CPU unless WEB_CONCURRENCY says otherwise
+    uvicorn.run(
+        "main:app",
+        host=os.getenv("HOST", "127.0.0.1"),
+        port=int(os.getenv("PORT", "8000")),
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+        log_level="warning",
+    )
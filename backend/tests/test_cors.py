@@ -0,0 +1,15 @@
+from fastapi.testclient import TestClient
+
+import main
+
+
+def test_cors_headers_echo_origin():
+    response = TestClient(main.app).get("/", headers={"Origin": "http://localhost:5173"})
+    assert response.headers["access-control-allow-origin"] == "http://localhost:5173"
+    assert response.headers["vary"] == "Origin"
+
+
+def test_response_without_origin_varies_on_origin():
+    response = TestClient(main.app).get("/")
+    assert "access-control-allow-origin" not in response.headers
+    assert response.headers["vary"] == "Origin"
@@ -0,0 +1,45 @@
+from main import restore_pii, sanitize_input
+
+
+def test_luhn_invalid_card_run_still_masks_ssn():
+    masked = sanitize_input("acct 1234 123-45-6789", session_id="luhn-ssn")
+    assert masked == "acct 1234 [MASKED_SSN#0]"
+    assert restore_pii(masked, session_id="luhn-ssn") == "acct 1234 123-45-6789"
+
+
+def test_luhn_invalid_card_run_still_masks_phone():
+    masked = sanitize_input("ref 123 555-123-4567 please", session_id="luhn-phone")
+    assert masked == "ref 123 [MASKED_PHONE#0] please"
+
+
+def test_luhn_valid_card_is_masked():
+    masked = sanitize_input("card 4111 1111 1111 1111", session_id="luhn-card")
+    assert masked == "card [MASKED_CREDIT_CARD:1111#0]"
+
+
+def test_unicode_digits_and_spaces_are_masked():
+    masked = sanitize_input("call ５５５-１２３-４５６７ now", session_id="uni-phone")
+    assert masked == "call [MASKED_PHONE#0] now"
+    masked = sanitize_input("ask John\u00a0Smith", session_id="uni-name")
+    assert masked == "ask [MASKED_NAME#0]"
+
+
+def test_address_is_masked():
+    masked = sanitize_input("I live at 12 North Main Street today", session_id="addr")
+    assert masked == "I live at [MASKED_ADDRESS#0] today"
+
+
+def test_address_does_not_swallow_a_clause():
+    masked = sanitize_input("I have 2 dogs and live on Main Street", session_id="addr-clause")
+    assert masked == "I have 2 dogs and live on [MASKED_NAME#0]"
+
+
+def test_denylisted_place_names_are_not_masked():
+    for text in ["Visit New York", "In New York", "The United States", "flights to Los  Angeles"]:
+        assert sanitize_input(text, session_id="deny") == text
+
+
+def test_name_before_denylisted_place_is_still_masked():
+    masked = sanitize_input("I met John Smith New York style", session_id="deny-name")
+    assert masked == "I met [MASKED_NAME#0] New York style"
+    assert restore_pii(masked, session_id="deny-name") == "I met John Smith New York style"
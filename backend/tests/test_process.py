@@ -0,0 +1,63 @@
+import asyncio
+
+import httpx
+
+import main
+
+
+def test_run_process_releases_pii_session(monkeypatch):
+    monkeypatch.setattr(main, "GEMINI_API_URL", None)
+    result, session_id = asyncio.run(main.run_process("mail a@b.com"))
+    assert result == "[LLM not configured]"
+    assert session_id not in main.PII_MAPPINGS
+
+
+def test_process_batch_limits_size_and_reports_errors(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    async def flaky_llm(prompt):
+        if "fail" in prompt:
+            raise RuntimeError("upstream down")
+        return prompt
+
+    monkeypatch.setattr(main, "gemini_llm_call", flaky_llm)
+    client = TestClient(main.app)
+
+    too_many = {"prompts": ["x"] * (main.MAX_BATCH_PROMPTS + 1)}
+    assert client.post("/process/batch", json=too_many).status_code == 422
+
+    response = client.post("/process/batch", json={"prompts": ["mail a@b.com", "fail"]})
+    assert response.status_code == 200
+    ok, failed = response.json()["results"]
+    assert ok["result"] == "mail a@b.com"
+    assert failed == {"error": "RuntimeError: upstream down"}
+
+
+def test_empty_gemini_reply_is_not_cached(monkeypatch):
+    replies = iter([{"candidates": [{"finishReason": "SAFETY"}]}, {"candidates": [{"content": {"parts": [{"text": "ok"}]}}]}])
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, json=next(replies)))
+    monkeypatch.setattr(main, "GEMINI_API_URL", "http://gemini.test/generate")
+    monkeypatch.setattr(main, "HTTP_CLIENT", httpx.AsyncClient(transport=transport))
+    assert asyncio.run(main.gemini_llm_call("cache-empty")) == ""
+    assert asyncio.run(main.gemini_llm_call("cache-empty")) == "ok"
+    assert asyncio.run(main.gemini_llm_call("cache-empty")) == "ok"
+
+
+def test_openapi_documents_struct_request_bodies():
+    from fastapi.testclient import TestClient
+
+    paths = TestClient(main.app).get("/openapi.json").json()["paths"]
+    schema = paths["/process"]["post"]["requestBody"]["content"]["application/json"]["schema"]
+    assert schema["required"] == ["prompt"]
+    batch = paths["/process/batch"]["post"]["requestBody"]["content"]["application/json"]["schema"]
+    assert batch["properties"]["prompts"]["maxItems"] == main.MAX_BATCH_PROMPTS
+    assert "requestBody" in paths["/llm/gemini"]["post"]
+
+
+def test_response_falls_back_for_wide_integers():
+    from fastapi.testclient import TestClient
+
+    big = 1180591620717411303424
+    response = TestClient(main.app).post("/mcp/external-api", params={"api": "x"}, json={"n": big})
+    assert response.status_code == 200
+    assert response.json()["params"] == {"n": big}
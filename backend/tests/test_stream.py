@@ -0,0 +1,48 @@
+import httpx
+import orjson
+from fastapi.testclient import TestClient
+
+import main
+
+
+def test_derive_stream_url():
+    assert (
+        main.derive_stream_url("https://g.test/v1beta/models/m:generateContent?key=k")
+        == "https://g.test/v1beta/models/m:streamGenerateContent?alt=sse&key=k"
+    )
+    assert (
+        main.derive_stream_url("https://g.test/v1beta/models/m:generateContent")
+        == "https://g.test/v1beta/models/m:streamGenerateContent?alt=sse"
+    )
+    assert main.derive_stream_url("https://proxy.test/gemini") is None
+
+
+def test_process_stream_without_stream_url_is_an_error(monkeypatch):
+    monkeypatch.setattr(main, "GEMINI_STREAM_URL", None)
+    response = TestClient(main.app).post("/process/stream", json={"prompt": "hi"})
+    assert response.status_code == 500
+    assert "GEMINI_STREAM_URL" in response.json()["detail"]
+
+
+def test_process_stream_sends_upstream_error_as_error_event(monkeypatch):
+    transport = httpx.MockTransport(lambda request: httpx.Response(503, text="overloaded"))
+    monkeypatch.setattr(main, "GEMINI_STREAM_URL", "http://gemini.test/stream")
+    monkeypatch.setattr(main, "HTTP_CLIENT", httpx.AsyncClient(transport=transport))
+    response = TestClient(main.app).post("/process/stream", json={"prompt": "hi"})
+    events = response.text.strip().split("\n\n")
+    assert events[-1] == "event: error\ndata: " + orjson.dumps({"error": "Gemini API error: overloaded"}).decode()
+    assert not any("text" in event for event in events)
+
+
+def test_process_stream_reports_malformed_events(monkeypatch):
+    good = b'data: {"candidates":[{"content":{"parts":[{"text":"hello"}]}}]}\r\n\r\n'
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=good + b"data: {oops\r\n\r\n"))
+    monkeypatch.setattr(main, "GEMINI_STREAM_URL", "http://gemini.test/stream")
+    monkeypatch.setattr(main, "HTTP_CLIENT", httpx.AsyncClient(transport=transport))
+    response = TestClient(main.app).post("/process/stream", json={"prompt": "mail a@b.com"})
+    events = response.text.strip().split("\n\n")
+    assert events[1] == 'data: {"text":"hello"}'
+    assert events[-1].startswith("event: error\ndata: ")
+    assert "Malformed Gemini stream event" in events[-1]
+    session_id = orjson.loads(events[0].removeprefix("data: "))["session_id"]
+    assert session_id not in main.PII_MAPPINGS